@@ -1,3 +1,3 @@
 """mminions: tmux session deployment for CLI agents."""
 
-__all__ = ["cli", "command", "config", "issue", "manager", "tmux", "types", "workers"]
+__all__ = ["cli", "command", "config", "files", "issue", "manager", "tmux", "types", "workers"]
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import argparse
 import os
@@ -25,8 +26,10 @@ def cmd_kill(args: argparse.Namespace) -> int:
     """Kill a session or all mminions sessions."""
     if args.all:
         sessions = [s for s in tmux.list_sessions() if s.startswith("mm-")]
+        if sessions:
+            with ThreadPoolExecutor(max_workers=min(8, len(sessions))) as ex:
+                list(ex.map(tmux.kill_session, sessions))
         for s in sessions:
-            tmux.kill_session(s)
             print(f"killed {s}")
     else:
         tmux.kill_session(args.session)
@@ -36,8 +39,7 @@ def cmd_kill(args: argparse.Namespace) -> int:
 
 def cmd_tail(args: argparse.Namespace) -> int:
     """Show recent output from a session."""
-    output = tmux.capture_pane(args.session, lines=args.lines)
-    print(output)
+    tmux.stream_pane(args.session, lambda line: print(line, end=""), lines=args.lines)
     return 0
 
 
@@ -1,12 +1,51 @@
 from __future__ import annotations
 
+from collections.abc import Callable, Sequence
 from pathlib import Path
+import asyncio
 import subprocess
 
 
-def run(args: list[str], cwd: Path, timeout: int = 120) -> subprocess.CompletedProcess:
+def run(args: Sequence[str], cwd: Path, timeout: int = 120) -> subprocess.CompletedProcess:
     return subprocess.run(args, cwd=cwd, capture_output=True, text=True, timeout=timeout)
 
 
+def run_quiet(args: Sequence[str], cwd: Path, timeout: int = 120) -> subprocess.CompletedProcess:
+    """Like run(), for commands whose output nobody reads: no pipes are set up."""
+    return subprocess.run(
+        args, cwd=cwd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=timeout
+    )
+
+
+async def run_async(args: Sequence[str], cwd: Path, timeout: int = 120) -> subprocess.CompletedProcess:
+    """Like run(), but awaits the child on the event loop instead of blocking a thread."""
+    proc = await asyncio.create_subprocess_exec(
+        *args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+    except (TimeoutError, asyncio.CancelledError) as exc:
+        # Never leave the child behind, whether we timed out or were cancelled
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+        if isinstance(exc, TimeoutError):
+            raise subprocess.TimeoutExpired(list(args), timeout) from None
+        raise
+    return subprocess.CompletedProcess(list(args), proc.returncode, stdout.decode(), stderr.decode())
+
+
 def run_shell(cmd: str, cwd: Path, timeout: int = 120) -> subprocess.CompletedProcess:
     return subprocess.run(cmd, cwd=cwd, capture_output=True, text=True, timeout=timeout, shell=True)
+
+
+def run_streaming(args: Sequence[str], cwd: Path, on_line: Callable[[str], None]) -> int:
+    """Run a command, passing each stdout line to `on_line` as it arrives. Returns the exit code."""
+    with subprocess.Popen(
+        args, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, bufsize=1
+    ) as proc:
+        for line in proc.stdout:
+            on_line(line)
+    return proc.returncode
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from collections.abc import Mapping
 from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
+from types import MappingProxyType
+from typing import Any
 import tomllib
 
 
@@ -14,19 +18,40 @@ class Config:
     model: str = ""
 
 
+@lru_cache(maxsize=8)
+def _parse_toml(path_str: str, mtime_ns: int, size: int) -> Mapping[str, Any]:
+    # Keyed on mtime and size so edits to the file are picked up. The result is
+    # shared between callers, so hand out read-only views of it and its tables.
+    with open(path_str, "rb") as f:
+        data = tomllib.load(f)
+    return MappingProxyType(
+        {k: MappingProxyType(v) if isinstance(v, dict) else v for k, v in data.items()}
+    )
+
+
+@lru_cache(maxsize=128)
+def _resolve(path_str: str) -> Path:
+    # realpath walks every component; configs resolve the same few paths repeatedly
+    return Path(path_str).resolve()
+
+
 def load_config(config_path: Path | None = None) -> Config:
     root = Path.cwd()
     path = config_path or root / "mminions.toml"
 
-    cfg: dict = {}
-    if path.exists():
-        cfg = tomllib.loads(path.read_text()).get("manager", {})
+    cfg: Mapping[str, Any] = {}
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        pass
+    else:
+        cfg = _parse_toml(str(path), st.st_mtime_ns, st.st_size).get("manager", {})
 
     def resolve(key: str, default: Path) -> Path:
         if val := cfg.get(key):
             p = Path(val)
-            return p if p.is_absolute() else (root / p).resolve()
-        return default.resolve()
+            return p if p.is_absolute() else _resolve(str(root / p))
+        return _resolve(str(default))
 
     return Config(
         repo_path=resolve("repo_path", root),
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from pathlib import Path
+import os
+import tempfile
+
+
+def atomic_write(path: Path, data: bytes, mode: int = 0o644) -> None:
+    """Write via a temp file and rename, so readers never see a partial file.
+
+    The file ends up with permissions `mode`, whatever the umask.
+    """
+    # A unique temp name per writer; two processes refreshing the same cache entry must not share one
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        try:
+            os.fchmod(fd, mode)
+            view = memoryview(data)
+            while view:
+                view = view[os.write(fd, view):]
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
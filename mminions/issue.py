@@ -1,42 +1,305 @@
 from __future__ import annotations
 
+from collections import deque
+from functools import lru_cache
+from pathlib import Path
 from typing import Any
-from urllib.error import HTTPError, URLError
-from urllib.request import Request, urlopen
+from urllib.parse import unquote, urlsplit
+from urllib.request import getproxies, proxy_bypass
+import base64
+import gzip
+import hashlib
+import http.client
 import json
 import os
 import re
+import string
+import threading
+import time
 
+from . import files
 from .types import IssueSpec
 
 ISSUE_URL_RE = re.compile(r"^https?://github\.com/([\w.-]+)/([\w.-]+)/issues/(\d+)")
 
+_URL_PREFIXES = ("https://github.com/", "http://github.com/")
+_NAME_CHARS = frozenset(string.ascii_letters + string.digits + "_.-")
+
+API_HOST = "api.github.com"
+
+# Everything the prompts use, in a single round trip
+_ISSUE_QUERY = """
+query($owner: String!, $repo: String!, $number: Int!) {
+  repository(owner: $owner, name: $repo) {
+    issue(number: $number) {
+      title
+      body
+      comments(first: 20) { nodes { body } }
+    }
+  }
+}
+"""
+
+# One keep-alive connection to the API, reused across fetches to skip TCP/TLS setup
+_conn: http.client.HTTPSConnection | None = None
+_conn_lock = threading.Lock()
+
+# GITHUB_TOKENS is a comma-separated pool used round-robin to spread rate limits
+_tokens = deque(t.strip() for t in os.getenv("GITHUB_TOKENS", "").split(",") if t.strip())
+_tokens_lock = threading.Lock()
+
 
 class IssueParseError(ValueError):
     pass
 
 
+def _is_name(part: str) -> bool:
+    return bool(part) and _NAME_CHARS.issuperset(part)
+
+
+@lru_cache(maxsize=1024)
 def parse_issue_url(url: str) -> tuple[str, str, int]:
-    match = ISSUE_URL_RE.match(url.strip())
+    url = url.strip()
+    # Fast path for plain issue URLs; anything unusual falls through to the regex
+    for prefix in _URL_PREFIXES:
+        if url.startswith(prefix):
+            parts = url[len(prefix):].split("/", 4)
+            if len(parts) < 4:
+                break
+            # Links copied from the browser often carry ?query or #issuecomment-N
+            number = parts[3].partition("?")[0].partition("#")[0]
+            if (
+                parts[2] == "issues"
+                and number.isascii()
+                and number.isdigit()
+                and _is_name(parts[0])
+                and _is_name(parts[1])
+            ):
+                return parts[0], parts[1], int(number)
+            break
+
+    match = ISSUE_URL_RE.match(url)
     if not match:
         raise IssueParseError(f"invalid GitHub issue URL: {url}")
     return match.group(1), match.group(2), int(match.group(3))
 
 
-def fetch_issue(url: str) -> IssueSpec:
-    owner, repo, number = parse_issue_url(url)
-    api_url = f"https://api.github.com/repos/{owner}/{repo}/issues/{number}"
+def _connect() -> http.client.HTTPSConnection:
+    proxy = getproxies().get("https")
+    if proxy and not proxy_bypass(API_HOST):
+        # Like urllib, accept a bare "host:port" and treat it as an http:// proxy
+        parts = urlsplit(proxy if "://" in proxy else f"//{proxy}")
+        try:
+            port = parts.port or (443 if parts.scheme == "https" else 80)
+        except ValueError:
+            port = None
+        if not parts.hostname or port is None:
+            raise http.client.InvalidURL(f"invalid proxy URL: {proxy!r}")
+        headers = {}
+        if parts.username:
+            # Same credential handling as urllib's ProxyHandler
+            credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+            headers["Proxy-Authorization"] = "Basic " + base64.b64encode(credentials.encode()).decode()
+        conn = http.client.HTTPSConnection(parts.hostname, port, timeout=20)
+        conn.set_tunnel(API_HOST, headers=headers)
+        return conn
+    return http.client.HTTPSConnection(API_HOST, timeout=20)
+
+
+def _send(method: str, path: str, headers: dict[str, str], body: bytes | None) -> tuple[int, Any, bytes]:
+    global _conn
+    try:
+        if _conn is None:
+            _conn = _connect()
+        _conn.request(method, path, body=body, headers=headers)
+        response = _conn.getresponse()
+        data = response.read()
+    except (http.client.HTTPException, OSError):
+        if _conn is not None:
+            _conn.close()
+            _conn = None
+        raise
+    if data and response.headers.get("Content-Encoding") == "gzip":
+        data = gzip.decompress(data)
+    return response.status, response.headers, data
+
+
+def _request(method: str, path: str, headers: dict[str, str], body: bytes | None = None) -> tuple[int, Any, bytes]:
+    """Send a request over the shared connection. Returns (status, headers, body)."""
+    with _conn_lock:
+        try:
+            return _send(method, path, headers, body)
+        except (http.client.HTTPException, OSError):
+            # The server may have closed an idle keep-alive connection; retry once on a fresh one
+            return _send(method, path, headers, body)
+
+
+def _token_order() -> list[str]:
+    """Tokens to try for one request, starting from the next in the rotation."""
+    if not _tokens:
+        return [os.getenv("GITHUB_TOKEN", "")]
+    with _tokens_lock:
+        order = list(_tokens)
+        _tokens.rotate(-1)
+    return order
+
+
+_REDIRECTS = (301, 302, 307, 308)
+_MAX_REDIRECTS = 5
+
+
+def _redirect_path(location: str) -> str | None:
+    """Path to follow for a redirect `location`, or None if it leaves the API host."""
+    parts = urlsplit(location)
+    if parts.netloc and (parts.scheme != "https" or parts.netloc != API_HOST):
+        return None
+    if not parts.path.startswith("/"):
+        return None
+    return f"{parts.path}?{parts.query}" if parts.query else parts.path
+
+
+def _call(
+    method: str, path: str, body: bytes | None = None, headers: dict[str, str] | None = None
+) -> tuple[int, Any, bytes]:
+    """Call the API with token rotation. Returns (status, headers, body) for 200 and 304."""
+    for token in _token_order():
+        request_headers = {
+            "Accept": "application/vnd.github+json",
+            "Accept-Encoding": "gzip",
+            "User-Agent": "mminions",
+        }
+        request_headers.update(headers or {})
+        if token:
+            request_headers["Authorization"] = f"Bearer {token}"
+        if body is not None:
+            request_headers["Content-Type"] = "application/json"
+
+        try:
+            status, response_headers, data = _request(method, path, request_headers, body)
+            # Renamed or transferred repos and issues answer with a redirect; the target is
+            # on the same host, so it goes over the same connection
+            for _ in range(_MAX_REDIRECTS):
+                if status not in _REDIRECTS:
+                    break
+                target = _redirect_path(response_headers.get("Location", ""))
+                if target is None:
+                    break
+                status, response_headers, data = _request(method, target, request_headers, body)
+        except (http.client.HTTPException, OSError) as exc:
+            raise IssueParseError(f"GitHub API failed: {exc}") from exc
+        # Rate-limited on this token; fall through to the next one in the pool
+        if status == 403 and response_headers.get("X-RateLimit-Remaining") == "0":
+            continue
+        break
 
-    headers = {"Accept": "application/vnd.github+json", "User-Agent": "mminions"}
-    if token := os.getenv("GITHUB_TOKEN"):
-        headers["Authorization"] = f"Bearer {token}"
+    if status not in (200, 304):
+        raise IssueParseError(f"GitHub API failed: HTTP {status}")
+    return status, response_headers, data
 
-    request = Request(api_url, headers=headers)
+
+# Seconds a disk-cached issue is used without asking GitHub; MMINIONS_ISSUE_TTL overrides
+_DEFAULT_TTL = 3600.0
+
+
+def _cache_path(key: str) -> Path:
+    root = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache")
+    return root / "mminions" / "issues" / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+
+def _read_cache(path: Path) -> dict | None:
+    """Read a cache entry. Unreadable or wrong-shaped entries count as a miss."""
+    try:
+        entry = json.loads(path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    if not (
+        isinstance(entry, dict)
+        and isinstance(entry.get("fetched_at"), (int, float))
+        and isinstance(entry.get("etag"), (str, type(None)))
+        and isinstance(entry.get("data"), dict)
+        and isinstance(entry["data"].get("comments"), list)
+    ):
+        return None
+    return entry
+
+
+def _cache_ttl() -> float:
+    try:
+        return float(os.getenv("MMINIONS_ISSUE_TTL", ""))
+    except ValueError:
+        return _DEFAULT_TTL
+
+
+def _write_cache(path: Path, data: dict, etag: str | None) -> None:
+    # The cache is best-effort; an unwritable cache dir must not fail the fetch
     try:
-        with urlopen(request, timeout=20) as response:
-            data = json.loads(response.read().decode("utf-8"))
-    except (HTTPError, URLError) as exc:
-        raise IssueParseError(f"GitHub API failed: {exc}") from exc
+        # Entries can hold private-repo issues fetched with a token; keep them owner-only
+        path.parent.mkdir(mode=0o700, parents=True, exist_ok=True)
+        entry = {"fetched_at": time.time(), "etag": etag, "data": data}
+        files.atomic_write(path, json.dumps(entry).encode(), mode=0o600)
+    except OSError:
+        pass
+
+
+def _fetch_rest(owner: str, repo: str, number: int, etag: str | None) -> tuple[dict | None, str | None]:
+    """Returns (data, etag); data is None when GitHub answers 304 Not Modified."""
+    headers = {"If-None-Match": etag} if etag else {}
+    status, response_headers, body = _call("GET", f"/repos/{owner}/{repo}/issues/{number}", headers=headers)
+    if status == 304:
+        return None, etag
+    data = json.loads(body)
+    # A new comment bumps the issue's updated_at, so the issue ETag covers comments too
+    comments = []
+    if data.get("comments"):
+        _, _, body = _call("GET", f"/repos/{owner}/{repo}/issues/{number}/comments?per_page=20")
+        comments = [c.get("body") or "" for c in json.loads(body)]
+    return {"title": data.get("title"), "body": data.get("body"), "comments": comments}, response_headers.get("ETag")
+
+
+def _fetch_graphql(owner: str, repo: str, number: int) -> dict:
+    query = {"query": _ISSUE_QUERY, "variables": {"owner": owner, "repo": repo, "number": number}}
+    _, _, body = _call("POST", "/graphql", json.dumps(query).encode())
+    data = json.loads(body)
+    if errors := data.get("errors"):
+        raise IssueParseError(f"GitHub API failed: {errors[0].get('message', errors[0])}")
+    issue = ((data.get("data") or {}).get("repository") or {}).get("issue")
+    if issue is None:
+        raise IssueParseError(f"GitHub API failed: {owner}/{repo}#{number} not found")
+    return {
+        "title": issue.get("title"),
+        "body": issue.get("body"),
+        "comments": [node.get("body") or "" for node in issue["comments"]["nodes"]],
+    }
+
+
+@lru_cache(maxsize=256)
+def _fetch(owner: str, repo: str, number: int) -> dict:
+    """Fetch title, body and comments. GraphQL needs a token; anonymous callers get REST.
+
+    Results are also cached on disk. Entries younger than MMINIONS_ISSUE_TTL seconds
+    are used as-is; older REST entries are revalidated with their ETag.
+    """
+    graphql = bool(_tokens or os.getenv("GITHUB_TOKEN"))
+    # v2: REST entries carry comments as well
+    cache_path = _cache_path(f"v2:{'graphql' if graphql else 'rest'}:{owner}/{repo}#{number}")
+    cached = _read_cache(cache_path)
+    if cached and time.time() - cached["fetched_at"] < _cache_ttl():
+        return cached["data"]
+
+    if graphql:
+        data, etag = _fetch_graphql(owner, repo, number), None
+    else:
+        data, etag = _fetch_rest(owner, repo, number, cached and cached.get("etag"))
+        if data is None:
+            data = cached["data"]
+
+    _write_cache(cache_path, data, etag)
+    return data
+
+
+def fetch_issue(url: str) -> IssueSpec:
+    owner, repo, number = parse_issue_url(url)
+    data = _fetch(owner, repo, number)
 
     return IssueSpec(
         url=url,
@@ -45,4 +308,5 @@ def fetch_issue(url: str) -> IssueSpec:
         number=number,
         title=str(data.get("title") or ""),
         body=str(data.get("body") or ""),
+        comments=tuple(data["comments"]),
     )
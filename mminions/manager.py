@@ -2,13 +2,20 @@ from __future__ import annotations
 
 from pathlib import Path
 import argparse
+import asyncio
+import itertools
 import json
+import re
+import secrets
 import time
 
-from . import command, tmux, workers
+from . import command, files, tmux, workers
 from .config import Config, load_config
 from .issue import fetch_issue, IssueParseError
-from .types import IssueSpec, ReproCandidate, Hypothesis, RunResult, to_dict
+from .types import IssueSpec, ReproCandidate, Hypothesis, RunResult, to_json
+
+# Outermost JSON object in a worker's output, which may be wrapped in markdown fences
+_JSON_OBJ_RE = re.compile(rb"\{.*\}", re.DOTALL)
 
 
 def run_id() -> str:
@@ -20,105 +27,171 @@ def log(msg: str) -> None:
 
 
 def setup_run_dir(runs_root: Path, rid: str) -> Path:
-    run_dir = runs_root / rid
-    (run_dir / "repro").mkdir(parents=True, exist_ok=True)
-    (run_dir / "triage").mkdir(parents=True, exist_ok=True)
-    (run_dir / "scripts").mkdir(parents=True, exist_ok=True)
+    """Create a fresh run directory. If `rid` is taken, claim `rid-1`, `rid-2`, ... instead."""
+    runs_root.mkdir(parents=True, exist_ok=True)
+    # mkdir either claims the name or fails, so concurrent runs can't share a directory
+    for n in itertools.count():
+        run_dir = runs_root / (rid if n == 0 else f"{rid}-{n}")
+        try:
+            run_dir.mkdir()
+            break
+        except FileExistsError:
+            continue
+    for sub in ("repro", "triage", "scripts"):
+        (run_dir / sub).mkdir()
     return run_dir
 
 
-def create_worktree(repo: Path, path: Path) -> None:
-    command.run(["git", "worktree", "add", str(path), "-d"], cwd=repo)
+def create_worktree(repo: Path, path: Path, attempts: int = 5) -> None:
+    # Concurrent adds can trip over each other's half-written .git/worktrees
+    # entries ("failed to read .../commondir"). The loser fails before checkout, so retry.
+    args = ["git", "worktree", "add", str(path), "-d"]
+    for _ in range(attempts - 1):
+        if command.run_quiet(args, cwd=repo).returncode == 0:
+            return
+        time.sleep(0.1)
+    # Last try captures output, so a failure that isn't the race says why
+    result = command.run(args, cwd=repo)
+    if result.returncode != 0:
+        raise RuntimeError(f"git worktree add {path} failed: {result.stderr.strip()}")
+
+
+async def remove_worktree(repo: Path, path: Path) -> None:
+    await command.run_async(["git", "worktree", "remove", "--force", str(path)], cwd=repo)
+
 
+async def remove_worktrees(repo: Path, paths: list[Path]) -> None:
+    """Remove worktrees concurrently; wall time is bounded by the slowest removal."""
+    await asyncio.gather(*(remove_worktree(repo, p) for p in paths))
 
-def remove_worktree(repo: Path, path: Path) -> None:
-    command.run(["git", "worktree", "remove", "--force", str(path)], cwd=repo)
+
+def worker_session(rid: str, worker_id: str) -> str:
+    return f"mm-{rid}-{worker_id}"
+
+
+def worker_worktree(rid: str, worker_id: str) -> Path:
+    return Path(f"/tmp/mm-{rid}-{worker_id}")
 
 
 def launch_worker(
     rid: str,
     worker_id: str,
     role: str,
-    prompt: str,
+    prompt_path: Path,
     run_dir: Path,
     repo: Path,
     model: str,
+    existing: set[str] | None = None,
+    nonce: str = "",
 ) -> tuple[str, Path, Path]:
-    """Launch a worker in tmux. Returns (session_name, output_path, worktree_path)."""
-    session = f"mm-{rid}-{worker_id}"
+    """Launch a worker in tmux. Returns (session_name, output_path, worktree_path).
+
+    `existing` is a snapshot of live session names; without one, tmux is asked.
+    `nonce` is the run's done-channel nonce; see tmux.done_channel.
+    """
+    session = worker_session(rid, worker_id)
     output_path = run_dir / role / f"{worker_id}.json"
-    worktree = Path(f"/tmp/mm-{rid}-{worker_id}")
-    script_path = run_dir / "scripts" / f"{worker_id}.sh"
+    worktree = worker_worktree(rid, worker_id)
 
     create_worktree(repo, worktree)
 
-    script = workers.make_worker_script(prompt, output_path, worktree, model)
-    script_path.write_text(script)
-    script_path.chmod(0o755)
+    script = workers.make_worker_script(
+        prompt_path, output_path, worktree, model, done_channel=tmux.done_channel(session, nonce)
+    )
 
-    if tmux.session_exists(session):
+    stale = tmux.session_exists(session) if existing is None else session in existing
+    if stale:
         tmux.kill_session(session)
-    tmux.create_session(session, worktree, str(script_path))
+    tmux.create_session(session, worktree, ["bash", "-c", script])
 
     return session, output_path, worktree
 
 
-def wait_for_workers(sessions: list[str], timeout: int, poll: int = 5) -> dict[str, str]:
-    """Wait for workers to finish. Returns {session: status}."""
-    start = time.time()
-    status = {s: "running" for s in sessions}
+async def wait_for_workers(
+    sessions: list[str], timeout: int, poll: float = 2.0, nonce: str = ""
+) -> dict[str, str]:
+    """Wait for workers to finish. Returns {session: status}.
 
-    while time.time() - start < timeout:
-        active = [s for s in sessions if tmux.session_exists(s)]
+    Each worker script signals its tmux wait-for channel on exit, so we await
+    those channels on the event loop. The signal lives in the tmux server,
+    though: a worker that exits before its waiter starts, as the last session
+    on the server, takes the signal down with it. So every `poll` seconds we
+    also count sessions that have disappeared as finished.
+    """
+    status = {s: "running" for s in sessions}
+    if not sessions:
+        return status
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    waits = {asyncio.create_task(tmux.wait_for(tmux.done_channel(s, nonce), timeout)): s for s in sessions}
+    pending = set(waits)
+
+    def finish(s: str) -> None:
+        status[s] = "finished"
+        log(f"  {s}: finished")
+
+    while True:
+        # Gone sessions are done whether or not their signal arrived. Drop their waiters
+        # rather than signalling: a second signal on a latched channel makes tmux forget it.
+        alive = set(tmux.list_sessions())
         for s in sessions:
-            if s not in active and status[s] == "running":
-                status[s] = "finished"
-                log(f"  {s}: finished")
-
-        if not active:
+            if status[s] == "running" and s not in alive:
+                finish(s)
+        for task in [t for t in pending if status[waits[t]] != "running"]:
+            task.cancel()
+            pending.discard(task)
+
+        remaining = deadline - loop.time()
+        if "running" not in status.values() or remaining <= 0:
             break
-        time.sleep(poll)
+        if not pending:
+            # Every waiter failed (e.g. tmux server restarted); fall back to polling
+            await asyncio.sleep(min(poll, remaining))
+            continue
+        done, pending = await asyncio.wait(
+            pending, timeout=min(poll, remaining), return_when=asyncio.FIRST_COMPLETED
+        )
+        for task in done:
+            # A failed wait (no server, channel lost) is settled by the liveness check above
+            if task.result():
+                finish(waits[task])
 
     for s in sessions:
         if status[s] == "running":
             status[s] = "timeout"
             tmux.kill_session(s)
             log(f"  {s}: timeout")
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*waits, return_exceptions=True)
 
     return status
 
 
+def read_worker_output(path: Path) -> dict:
+    raw = path.read_bytes()
+    match = _JSON_OBJ_RE.search(raw)
+    return json.loads(match.group(0) if match else raw)
+
+
 def parse_repro_output(path: Path, worker_id: str) -> ReproCandidate | None:
-    if not path.exists():
-        return None
     try:
-        raw = path.read_text()
-        # Handle markdown-wrapped JSON
-        if "```" in raw:
-            start = raw.find("{")
-            end = raw.rfind("}") + 1
-            raw = raw[start:end]
-        data = json.loads(raw)
+        data = read_worker_output(path)
         return ReproCandidate(
             worker_id=worker_id,
             script=data.get("script", ""),
             oracle_command=data.get("oracle_command", ""),
             failure_signature=data.get("failure_signature", ""),
         )
-    except (json.JSONDecodeError, KeyError):
+    # A worker that never wrote output is handled like one that wrote garbage
+    except (FileNotFoundError, ValueError, KeyError):
         return None
 
 
 def parse_triage_output(path: Path, worker_id: str) -> list[Hypothesis]:
-    if not path.exists():
-        return []
     try:
-        raw = path.read_text()
-        if "```" in raw:
-            start = raw.find("{")
-            end = raw.rfind("}") + 1
-            raw = raw[start:end]
-        data = json.loads(raw)
+        data = read_worker_output(path)
         return [
             Hypothesis(
                 worker_id=worker_id,
@@ -128,11 +201,64 @@ def parse_triage_output(path: Path, worker_id: str) -> list[Hypothesis]:
             )
             for h in data.get("hypotheses", [])
         ]
-    except (json.JSONDecodeError, KeyError):
+    # A worker that never wrote output is handled like one that wrote garbage
+    except (FileNotFoundError, ValueError, KeyError):
         return []
 
 
+async def launch_workers(
+    rid: str,
+    role: str,
+    worker_ids: list[str],
+    prompt: str,
+    run_dir: Path,
+    config: Config,
+    nonce: str = "",
+) -> list[tuple[str, Path, Path]]:
+    """Launch workers sharing one prompt concurrently. Results follow `worker_ids` order.
+
+    If a launch fails or we are cancelled, waits for launches already in flight
+    before re-raising, so the caller's cleanup sees every session and worktree
+    they created.
+    """
+    # Every worker in a phase gets the same prompt, so write it once
+    prompt_path = run_dir / "scripts" / f"{role}.prompt"
+    prompt_path.write_text(prompt)
+    # One `tmux ls` for the whole phase rather than one per worker
+    existing = set(tmux.list_sessions())
+
+    # Launches are short and subprocess-bound (git worktree add, tmux), so threads are fine here
+    tasks = [
+        asyncio.ensure_future(
+            asyncio.to_thread(
+                launch_worker,
+                rid,
+                wid,
+                role,
+                prompt_path,
+                run_dir,
+                config.repo_path,
+                config.model,
+                existing,
+                nonce,
+            )
+        )
+        for wid in worker_ids
+    ]
+    try:
+        return await asyncio.shield(asyncio.gather(*tasks))
+    except BaseException:
+        # Neither a sibling's failure nor cancellation stops a thread mid-launch;
+        # let them all finish rather than race the caller's cleanup
+        await asyncio.wait(tasks)
+        raise
+
+
 def run(issue_url: str, config: Config) -> RunResult:
+    return asyncio.run(run_async(issue_url, config))
+
+
+async def run_async(issue_url: str, config: Config) -> RunResult:
     rid = run_id()
     log(f"[run] {rid}")
 
@@ -148,61 +274,72 @@ def run(issue_url: str, config: Config) -> RunResult:
 
     # Setup
     run_dir = setup_run_dir(config.runs_root, rid)
+    if run_dir.name != rid:
+        # Another run started in the same second; session and worktree names follow the dir
+        rid = run_dir.name
+        log(f"[run] using {rid}")
+    sessions: list[str] = []
     worktrees: list[Path] = []
+    # Done channels are per run: a stale session reusing a worker's name can't latch them
+    nonce = secrets.token_hex(4)
 
-    # Phase 1: Repro workers
-    log(f"[repro] launching {config.workers} workers")
-    repro_sessions = []
-    repro_outputs = []
-
-    for i in range(config.workers):
-        wid = f"repro-w{i+1}"
-        prompt = workers.repro_prompt(issue, wid)
-        session, output, wt = launch_worker(
-            rid, wid, "repro", prompt, run_dir, config.repo_path, config.model
-        )
-        repro_sessions.append(session)
-        repro_outputs.append((wid, output))
-        worktrees.append(wt)
-        log(f"  {wid}: {session}")
-
-    log("[repro] waiting")
-    wait_for_workers(repro_sessions, config.timeout_sec)
-
-    # Parse repro outputs
-    candidates = []
-    for wid, path in repro_outputs:
-        if c := parse_repro_output(path, wid):
-            candidates.append(c)
-            log(f"  {wid}: got candidate")
-
-    best_repro = candidates[0] if candidates else None
-    if not best_repro:
-        log("[repro] no valid candidates")
-        for wt in worktrees:
-            remove_worktree(config.repo_path, wt)
-        return RunResult(rid, "no-repro", None, [])
-
-    log(f"[repro] using {best_repro.worker_id}")
-
-    # Phase 2: Triage workers
-    log(f"[triage] launching {config.workers} workers")
-    triage_sessions = []
-    triage_outputs = []
-
-    for i in range(config.workers):
-        wid = f"triage-w{i+1}"
-        prompt = workers.triage_prompt(issue, wid, best_repro.script)
-        session, output, wt = launch_worker(
-            rid, wid, "triage", prompt, run_dir, config.repo_path, config.model
-        )
-        triage_sessions.append(session)
-        triage_outputs.append((wid, output))
-        worktrees.append(wt)
-        log(f"  {wid}: {session}")
-
-    log("[triage] waiting")
-    wait_for_workers(triage_sessions, config.timeout_sec)
+    try:
+        # Phase 1: Repro workers
+        log(f"[repro] launching {config.workers} workers")
+        repro_outputs = []
+        repro_ids = [f"repro-w{i+1}" for i in range(config.workers)]
+        prompt = workers.repro_prompt(issue, "")
+        # Record names up front so an interrupted launch is still cleaned up
+        sessions.extend(worker_session(rid, wid) for wid in repro_ids)
+        worktrees.extend(worker_worktree(rid, wid) for wid in repro_ids)
+        launched = await launch_workers(rid, "repro", repro_ids, prompt, run_dir, config, nonce)
+
+        for wid, (session, output, _) in zip(repro_ids, launched):
+            repro_outputs.append((wid, output))
+            log(f"  {wid}: {session}")
+
+        log("[repro] waiting")
+        await wait_for_workers([s for s, _, _ in launched], config.timeout_sec, nonce=nonce)
+
+        # Parse repro outputs
+        candidates = []
+        for wid, path in repro_outputs:
+            if c := parse_repro_output(path, wid):
+                candidates.append(c)
+                log(f"  {wid}: got candidate")
+
+        best_repro = candidates[0] if candidates else None
+        if not best_repro:
+            log("[repro] no valid candidates")
+            await remove_worktrees(config.repo_path, worktrees)
+            return RunResult(rid, "no-repro", None, [])
+
+        log(f"[repro] using {best_repro.worker_id}")
+
+        # Phase 2: Triage workers
+        log(f"[triage] launching {config.workers} workers")
+        triage_outputs = []
+        triage_ids = [f"triage-w{i+1}" for i in range(config.workers)]
+        prompt = workers.triage_prompt(issue, "", best_repro.script)
+        # Record names up front so an interrupted launch is still cleaned up
+        sessions.extend(worker_session(rid, wid) for wid in triage_ids)
+        worktrees.extend(worker_worktree(rid, wid) for wid in triage_ids)
+        launched = await launch_workers(rid, "triage", triage_ids, prompt, run_dir, config, nonce)
+
+        for wid, (session, output, _) in zip(triage_ids, launched):
+            triage_outputs.append((wid, output))
+            log(f"  {wid}: {session}")
+
+        log("[triage] waiting")
+        await wait_for_workers([s for s, _, _ in launched], config.timeout_sec, nonce=nonce)
+    except BaseException as exc:
+        # Ctrl-C or a failed phase: don't leak tmux sessions or worktrees
+        why = "interrupted" if isinstance(exc, asyncio.CancelledError) else f"failed: {exc}"
+        log(f"[run] {why}, cleaning up")
+        for s in sessions:
+            tmux.kill_session(s)
+        await remove_worktrees(config.repo_path, worktrees)
+        raise
 
     # Parse triage outputs
     hypotheses = []
@@ -213,13 +350,12 @@ def run(issue_url: str, config: Config) -> RunResult:
             log(f"  {wid}: {len(hyps)} hypotheses")
 
     # Cleanup
-    for wt in worktrees:
-        remove_worktree(config.repo_path, wt)
+    await remove_worktrees(config.repo_path, worktrees)
 
     # Write result
     result = RunResult(rid, "ok", best_repro, hypotheses)
     result_path = run_dir / "result.json"
-    result_path.write_text(json.dumps(to_dict(result), indent=2))
+    files.atomic_write(result_path, to_json(result).encode())
 
     log(f"[done] {run_dir}")
     return result
@@ -245,8 +381,11 @@ def main() -> int:
         model=args.model,
     )
 
-    result = run(args.issue_url, cfg)
-    print(json.dumps(to_dict(result), indent=2))
+    try:
+        result = run(args.issue_url, cfg)
+    except KeyboardInterrupt:
+        return 130
+    print(to_json(result))
     return 0 if result.status == "ok" else 1
 
 
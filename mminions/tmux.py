@@ -1,11 +1,32 @@
 from __future__ import annotations
 
+from collections.abc import Callable, Sequence
 from pathlib import Path
+import os
+import subprocess
+
 from . import command
 
+# tmux talks to its server over a socket, so commands don't need a meaningful cwd
+_CWD = Path("/")
+_LIST_SESSIONS_ARGS = ("tmux", "ls", "-F", "#{session_name}")
+
+
+def _server_socket() -> Path:
+    """Socket tmux would connect to: $TMUX inside a session, else the default one."""
+    if inside := os.environ.get("TMUX"):
+        return Path(inside.split(",", 1)[0])
+    return Path(os.environ.get("TMUX_TMPDIR") or "/tmp") / f"tmux-{os.getuid()}" / "default"
+
+
+# If the socket is missing there is no server and so no sessions
+_SOCKET = _server_socket()
+
 
 def list_sessions() -> list[str]:
-    result = command.run(["tmux", "ls", "-F", "#{session_name}"], cwd=Path.cwd())
+    if not _SOCKET.exists():
+        return []
+    result = command.run(_LIST_SESSIONS_ARGS, cwd=_CWD)
     if result.returncode != 0:
         return []
     return [line.strip() for line in result.stdout.splitlines() if line.strip()]
@@ -15,14 +36,41 @@ def session_exists(name: str) -> bool:
     return name in list_sessions()
 
 
-def create_session(name: str, workdir: Path, cmd: str) -> None:
-    command.run(["tmux", "new-session", "-d", "-s", name, "-c", str(workdir), cmd], cwd=workdir)
+def create_session(name: str, workdir: Path, cmd: str | Sequence[str]) -> None:
+    """Start a detached session. A list `cmd` is exec'd by tmux without a shell."""
+    argv = [cmd] if isinstance(cmd, str) else list(cmd)
+    command.run_quiet(["tmux", "new-session", "-d", "-s", name, "-c", str(workdir), *argv], cwd=workdir)
 
 
 def kill_session(name: str) -> None:
-    command.run(["tmux", "kill-session", "-t", name], cwd=Path.cwd())
+    command.run_quiet(["tmux", "kill-session", "-t", name], cwd=_CWD)
 
 
 def capture_pane(name: str, lines: int = 100) -> str:
-    result = command.run(["tmux", "capture-pane", "-p", "-t", name, "-S", f"-{lines}"], cwd=Path.cwd())
+    result = command.run(["tmux", "capture-pane", "-p", "-t", name, "-S", f"-{lines}"], cwd=_CWD)
     return result.stdout if result.returncode == 0 else ""
+
+
+def stream_pane(name: str, on_line: Callable[[str], None], lines: int = 100) -> int:
+    """Like capture_pane, but hands lines to `on_line` without buffering the whole pane."""
+    return command.run_streaming(
+        ["tmux", "capture-pane", "-p", "-t", name, "-S", f"-{lines}"], cwd=_CWD, on_line=on_line
+    )
+
+
+def done_channel(name: str, nonce: str = "") -> str:
+    """Name of the wait-for channel a worker session signals when it exits.
+
+    `nonce` keeps a killed stale session of the same name, whose exit trap
+    still fires, from latching the channel a new worker is waited on with.
+    """
+    return f"done-{name}-{nonce}" if nonce else f"done-{name}"
+
+
+async def wait_for(channel: str, timeout: int) -> bool:
+    """Wait until `channel` is signalled. Returns False on timeout."""
+    try:
+        result = await command.run_async(["tmux", "wait-for", channel], cwd=_CWD, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return False
+    return result.returncode == 0
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
-from dataclasses import asdict, dataclass, field
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Any
+import json
 
 
 def now_utc() -> str:
     return datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class IssueSpec:
     url: str
     owner: str
@@ -17,9 +18,10 @@ class IssueSpec:
     number: int
     title: str
     body: str
+    comments: tuple[str, ...] = ()
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class ReproCandidate:
     worker_id: str
     script: str
@@ -27,7 +29,7 @@ class ReproCandidate:
     failure_signature: str
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Hypothesis:
     worker_id: str
     mechanism: str
@@ -35,7 +37,7 @@ class Hypothesis:
     line: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class RunResult:
     run_id: str
     status: str
@@ -50,5 +52,17 @@ def to_dict(value: Any) -> Any:
     if isinstance(value, dict):
         return {k: to_dict(v) for k, v in value.items()}
     if hasattr(value, "__dataclass_fields__"):
-        return {k: to_dict(v) for k, v in asdict(value).items()}
+        # Walk fields directly; asdict would deep-copy everything before we recurse anyway
+        return {k: to_dict(getattr(value, k)) for k in value.__dataclass_fields__}
     return value
+
+
+def _json_default(value: Any) -> Any:
+    if hasattr(value, "__dataclass_fields__"):
+        return {k: getattr(value, k) for k in value.__dataclass_fields__}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def to_json(value: Any, indent: int | None = 2) -> str:
+    """Serialize dataclasses in one pass; same output as json.dumps(to_dict(value))."""
+    return json.dumps(value, indent=indent, default=_json_default)
@@ -7,30 +7,51 @@ import shlex
 from .types import IssueSpec
 
 
-def repro_prompt(issue: IssueSpec, worker_id: str) -> str:
-    return f"""Build a minimal reproducer for this GitHub issue.
+# Static headers, built once at import rather than re-formatted on every prompt
+REPRO_INSTRUCTIONS = """Build a minimal reproducer for this GitHub issue.
 Output JSON only:
-{{
+{
   "script": "<python script>",
-  "oracle_command": "python {{repro_file}}",
+  "oracle_command": "python {repro_file}",
   "failure_signature": "<string that appears when bug reproduces>"
-}}
+}"""
+
+TRIAGE_INSTRUCTIONS = """Analyze this bug and find the root cause in the codebase.
+Output JSON only:
+{
+  "hypotheses": [
+    {"mechanism": "<what fails and why>", "file": "<path>", "line": <number>}
+  ]
+}"""
+
+
+# Per-comment cap, so one pasted log can't crowd the issue out of the prompt
+MAX_COMMENT_CHARS = 4000
+
+
+def _comments(issue: IssueSpec) -> str:
+    if not issue.comments:
+        return ""
+    comments = (
+        c if len(c) <= MAX_COMMENT_CHARS else c[:MAX_COMMENT_CHARS] + "\n[... truncated]"
+        for c in issue.comments
+    )
+    return "\nComments:\n" + "\n---\n".join(comments) + "\n"
+
+
+def repro_prompt(issue: IssueSpec, worker_id: str) -> str:
+    # worker_id isn't part of the text, so one prompt serves every worker in a phase
+    return f"""{REPRO_INSTRUCTIONS}
 
 Issue: {issue.owner}/{issue.repo}#{issue.number}
 Title: {issue.title}
 
 {issue.body}
-"""
+{_comments(issue)}"""
 
 
 def triage_prompt(issue: IssueSpec, worker_id: str, repro_script: str) -> str:
-    return f"""Analyze this bug and find the root cause in the codebase.
-Output JSON only:
-{{
-  "hypotheses": [
-    {{"mechanism": "<what fails and why>", "file": "<path>", "line": <number>}}
-  ]
-}}
+    return f"""{TRIAGE_INSTRUCTIONS}
 
 Issue: {issue.owner}/{issue.repo}#{issue.number}
 Title: {issue.title}
@@ -41,14 +62,19 @@ Reproducer:
 ```
 
 {issue.body}
-"""
+{_comments(issue)}"""
 
 
-def make_worker_script(prompt: str, output_path: Path, worktree: Path, model: str = "") -> str:
+def make_worker_script(
+    prompt_path: Path, output_path: Path, worktree: Path, model: str = "", done_channel: str = ""
+) -> str:
+    """Shell snippet that runs codex on the prompt stored at `prompt_path`; meant for `bash -c`."""
     model_arg = f"-m {shlex.quote(model)} " if model else ""
-    escaped_prompt = shlex.quote(prompt)
-    return f"""#!/usr/bin/env bash
-set -euo pipefail
-cd {worktree}
-codex exec {escaped_prompt} {model_arg}-s read-only -C {worktree} -o {output_path}
+    wt = shlex.quote(str(worktree))
+    # Signal the manager on any exit, including failures and kill-session. This is
+    # also why codex isn't exec'd: bash has to outlive it to run the trap.
+    trap = f"trap {shlex.quote(f'tmux wait-for -S {done_channel}')} EXIT\n" if done_channel else ""
+    return f"""set -euo pipefail
+{trap}cd {wt}
+codex exec "$(cat {shlex.quote(str(prompt_path))})" {model_arg}-s read-only -C {wt} -o {shlex.quote(str(output_path))}
 """